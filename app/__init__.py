@@ -2,6 +2,7 @@ from flask import Flask, jsonify, render_template, redirect, url_for, request, f
 from flask_cors import CORS
 from app.config.configuracion import Config
 from app.config.base_datos import probar_conexion
+from app.servicios.admision import limitar
 from app.servicios.gastos import listar_gastos, crear_gasto, obtener_gasto, editar_gasto, borrar_gasto as borrar_gasto_servicio, estadisticas_por_categoria
 from datetime import datetime
 
@@ -19,11 +20,20 @@ def crear_app():
     from app.rutas.gastos import gastos_bp
     app.register_blueprint(gastos_bp, url_prefix='/api')
     print("Rutas de gastos registradas")
+    from app.rutas.presupuestos import presupuestos_bp
+    app.register_blueprint(presupuestos_bp, url_prefix='/api')
+    print("Rutas de presupuestos registradas")
+    from app.servicios.filtros import agregar_endpoints_filtros
+    agregar_endpoints_filtros(app)
+    print("Rutas de filtros registradas")
 
     @app.route('/')
+    @limitar('index')
     def index():
-        gastos = listar_gastos()
+        gastos, truncado = listar_gastos()
         estadisticas = estadisticas_por_categoria()
+        if truncado:
+            flash(f'Se muestran los {len(gastos)} gastos más recientes', 'warning')
         return render_template('index.html', gastos=gastos, estadisticas=estadisticas)
 
     @app.route('/nuevo', methods=['GET', 'POST'])
@@ -51,8 +61,8 @@ def crear_app():
                     'origen': origen,
                     'fecha': fecha if fecha else None
                 }
-                exito = crear_gasto(gasto)
-                if exito:
+                gasto_id, estado = crear_gasto(gasto)
+                if estado == 'creado':
                     flash('Gasto agregado exitosamente', 'success')
                 else:
                     flash('No se pudo agregar el gasto', 'danger')
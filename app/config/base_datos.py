@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 import os
 from dotenv import load_dotenv
@@ -54,11 +54,59 @@ class BaseDatos:
             self._db = None
             print("Conexion a MongoDB cerrada")
 
+def obtener_db():
+    bd = BaseDatos()
+    return bd.obtener_db()
+
 def obtener_coleccion_gastos():
 
     bd = BaseDatos()
     return bd.obtener_coleccion('gastos')
 
+def obtener_coleccion_presupuestos():
+
+    bd = BaseDatos()
+    return bd.obtener_coleccion('presupuestos')
+
+def completar_huellas(gastos, tamano_lote=1000):
+    """
+    Calcula la huella de los gastos cargados antes de que existiera.
+    Los duplicados que ya hubiera se conservan: pueden ser gastos
+    legítimamente iguales y la importación los cuenta como tales
+    """
+    from app.modelos.gasto import Gasto
+    campos = {'fecha': 1, 'monto': 1, 'descripcion': 1, 'origen': 1}
+    operaciones = []
+    completados = 0
+    for gasto in gastos.find({'huella': {'$exists': False}}, campos):
+        operaciones.append(UpdateOne({'_id': gasto['_id']}, {'$set': {'huella': Gasto.calcular_huella(gasto)}}))
+        if len(operaciones) >= tamano_lote:
+            gastos.bulk_write(operaciones, ordered=False)
+            completados += len(operaciones)
+            operaciones = []
+    if operaciones:
+        gastos.bulk_write(operaciones, ordered=False)
+        completados += len(operaciones)
+    return completados
+
+def asegurar_indices():
+    gastos = obtener_coleccion_gastos()
+    if gastos is None:
+        return False
+    completados = completar_huellas(gastos)
+    if completados:
+        print(f"Huella calculada para {completados} gastos existentes")
+    gastos.create_index('huella', name='huella')
+    gastos.create_index(
+        'clave_idempotencia',
+        name='clave_idempotencia_unica',
+        unique=True,
+        partialFilterExpression={'clave_idempotencia': {'$exists': True}}
+    )
+    from app.servicios.planificador import crear_indices
+    crear_indices(gastos)
+    return True
+
 def probar_conexion():
     try:
         bd = BaseDatos()
@@ -67,6 +115,8 @@ def probar_conexion():
             gastos = obtener_coleccion_gastos()
             if gastos is not None:
                 print(f"Colección 'gastos' accesible")
+                asegurar_indices()
+                print("Indices de gastos verificados")
             return True
         else:
             print("No se pudo conectar a MongoDB")
@@ -23,6 +23,30 @@ class Config:
     
     GASTOS_POR_PAGINA = 10
 
+    # Presupuesto mensual por categoría; se puede sobreescribir con PUT /api/presupuestos
+    PRESUPUESTOS_MENSUALES = {}
+
+    PRESUPUESTO_UMBRAL_ALERTA = float(os.getenv('PRESUPUESTO_UMBRAL_ALERTA', 0.8))
+
+    CONSULTA_MAX_TIME_MS = int(os.getenv('CONSULTA_MAX_TIME_MS', 2000))
+
+    CONSULTA_MAX_DOCUMENTOS = int(os.getenv('CONSULTA_MAX_DOCUMENTOS', 5000))
+
+    LIMITES_BACKEND = os.getenv('LIMITES_BACKEND', 'memoria')
+
+    ADMISION_RETRY_AFTER = 1
+
+    # concurrencia: solicitudes simultáneas por proceso
+    # tasa / rafaga: token bucket por cliente (tokens por segundo / capacidad)
+    LIMITES_ENDPOINTS = {
+        'index': {'concurrencia': 4, 'tasa': 2, 'rafaga': 10},
+        'listar_gastos': {'concurrencia': 4, 'tasa': 2, 'rafaga': 10},
+        'filtrar_gastos': {'concurrencia': 2, 'tasa': 1, 'rafaga': 5},
+        'importar_gastos': {'concurrencia': 1, 'tasa': 0.2, 'rafaga': 2}
+    }
+
+    IMPORTACION_MAX_GASTOS = int(os.getenv('IMPORTACION_MAX_GASTOS', 1000))
+
     CATEGORIAS_PERMITIDAS = [
         "Alimentación",
         "Transporte", 
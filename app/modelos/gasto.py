@@ -1,13 +1,20 @@
 from datetime import datetime
 from bson import ObjectId
+import hashlib
+import re
+import unicodedata
 from ..config.configuracion import Config
 
 class Gasto:
     
-    def __init__(self, descripcion, monto, categoria, fecha=None):
+    # campos de uso interno que no se devuelven en las respuestas
+    CAMPOS_INTERNOS = ('huella', 'huella_solicitud', 'clave_idempotencia')
+    
+    def __init__(self, descripcion, monto, categoria, fecha=None, origen=None):
         self.descripcion = descripcion
         self.monto = monto
         self.categoria = categoria
+        self.origen = origen
         self.fecha = fecha if fecha else datetime.now().strftime('%d-%m-%Y')
         self.fecha_creacion = datetime.now() 
         self.fecha_actualizacion = datetime.now()
@@ -17,6 +24,7 @@ class Gasto:
             'descripcion': self.descripcion,
             'monto': self.monto,
             'categoria': self.categoria,
+            'origen': self.origen,
             'fecha': self.fecha,
             'fecha_creacion': self.fecha_creacion,
             'fecha_actualizacion': self.fecha_actualizacion
@@ -28,7 +36,8 @@ class Gasto:
             descripcion=data.get('descripcion'),
             monto=data.get('monto'),
             categoria=data.get('categoria'),
-            fecha=data.get('fecha')
+            fecha=data.get('fecha'),
+            origen=data.get('origen')
         )
         
         if 'fecha_creacion' in data:
@@ -77,6 +86,35 @@ class Gasto:
         
         return len(errores) == 0, errores
     
+    @staticmethod
+    def normalizar_texto(texto):
+        """
+        Pasa a minúsculas, quita acentos y colapsa espacios
+        """
+        if not texto:
+            return ''
+        texto = unicodedata.normalize('NFKD', str(texto))
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+        return re.sub(r'\s+', ' ', texto).strip().lower()
+    
+    @staticmethod
+    def calcular_huella(data):
+        """
+        Huella de contenido (fecha, monto, descripción normalizada, origen)
+        indexada para detectar duplicados al importar
+        """
+        try:
+            monto = f"{float(data.get('monto')):.2f}"
+        except (ValueError, TypeError):
+            monto = ''
+        partes = [
+            str(data.get('fecha') or '').strip(),
+            monto,
+            Gasto.normalizar_texto(data.get('descripcion')),
+            Gasto.normalizar_texto(data.get('origen'))
+        ]
+        return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()
+    
     @staticmethod
     def formatear_para_respuesta(documento_mongo):
 
@@ -87,6 +125,9 @@ class Gasto:
             documento_mongo['id'] = str(documento_mongo['_id'])
             del documento_mongo['_id']
         
+        for campo in Gasto.CAMPOS_INTERNOS:
+            documento_mongo.pop(campo, None)
+        
         if 'fecha_creacion' in documento_mongo:
             documento_mongo['fecha_creacion'] = documento_mongo['fecha_creacion'].isoformat()
         if 'fecha_actualizacion' in documento_mongo:
@@ -110,7 +151,31 @@ def crear_gasto_desde_json(data):
         descripcion=data['descripcion'].strip(),
         monto=float(data['monto']),
         categoria=data['categoria'],
-        fecha=data.get('fecha')
+        fecha=data.get('fecha'),
+        origen=data.get('origen')
     )
     
-    return gasto, []
\ No newline at end of file
+    return gasto, []
+
+
+def actualizacion_desde_json(data):
+    """
+    Valida sólo los campos enviados en una edición parcial y devuelve
+    (datos, errores) con el monto convertido a float
+    """
+    campos = ('descripcion', 'monto', 'categoria', 'origen', 'fecha')
+    datos = {campo: data[campo] for campo in campos if campo in data}
+    if not datos:
+        return None, ['No se enviaron campos para actualizar']
+    # relleno válido para los campos obligatorios que no se enviaron
+    completos = {'descripcion': 'relleno', 'monto': 1, 'categoria': Config.CATEGORIAS_PERMITIDAS[0]}
+    completos.update(datos)
+    es_valido, errores = Gasto.validar_datos(completos)
+    if not es_valido:
+        return None, errores
+    if 'descripcion' in datos:
+        datos['descripcion'] = datos['descripcion'].strip()
+    if 'monto' in datos:
+        datos['monto'] = float(datos['monto'])
+    datos['fecha_actualizacion'] = datetime.now()
+    return datos, []
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from app.servicios.gastos import listar_gastos as listar_gastos_servicio, crear_gasto as crear_gasto_servicio, obtener_gasto as obtener_gasto_servicio, editar_gasto as editar_gasto_servicio, borrar_gasto as borrar_gasto_servicio
-from app.modelos.gasto import Gasto, crear_gasto_desde_json
+from app.servicios.gastos import listar_gastos as listar_gastos_servicio, crear_gasto as crear_gasto_servicio, obtener_gasto as obtener_gasto_servicio, editar_gasto as editar_gasto_servicio, borrar_gasto as borrar_gasto_servicio, importar_gastos as importar_gastos_servicio
+from app.modelos.gasto import Gasto, crear_gasto_desde_json, actualizacion_desde_json
 from app.config.configuracion import Config
+from app.servicios.admision import limitar
+from pymongo.errors import ExecutionTimeout
 from bson import ObjectId
 from bson.errors import InvalidId
 from datetime import datetime
@@ -14,10 +16,13 @@ gastos_bp = Blueprint('gastos', __name__)
 # ========================================
 
 @gastos_bp.route('/gastos', methods=['GET'])
+@limitar('listar_gastos')
 def listar_gastos():
     try:
-        gastos = listar_gastos_servicio() 
-        return jsonify({'gastos': gastos})
+        gastos, truncado = listar_gastos_servicio()
+        return jsonify({'gastos': gastos, 'truncado': truncado})
+    except ExecutionTimeout:
+        raise
     except Exception as e:
         return jsonify({'error': 'Error interno del servidor', 'detalle': str(e)}), 500
 
@@ -48,10 +53,50 @@ def crear_gasto():
         gasto, errores = crear_gasto_desde_json(datos)
         if not gasto:
             return jsonify({'error': 'Datos inválidos', 'errores': errores}), 400
-        exito = crear_gasto_servicio(gasto.to_dict())
-        if not exito:
-            return jsonify({'error': 'No se pudo agregar el gasto'}), 500
-        return jsonify({'mensaje': 'Gasto creado exitosamente'}), 201
+        clave = request.headers.get('Idempotency-Key')
+        gasto_id, estado = crear_gasto_servicio(gasto.to_dict(), clave_idempotencia=clave)
+        if estado in ('creado', 'repetido'):
+            return jsonify({'mensaje': 'Gasto creado exitosamente', 'id': gasto_id}), 201
+        if estado == 'conflicto':
+            return jsonify({'error': 'La Idempotency-Key ya se usó con otros datos', 'id': gasto_id}), 422
+        return jsonify({'error': 'No se pudo agregar el gasto'}), 500
+    except Exception as e:
+        return jsonify({'error': 'Error interno del servidor', 'detalle': str(e)}), 500
+
+# ========================================
+# ENDPOINT 3b: POST /api/gastos/importar - IMPORTAR GASTOS EN LOTE
+# ========================================
+
+@gastos_bp.route('/gastos/importar', methods=['POST'])
+@limitar('importar_gastos')
+def importar_gastos():
+    try:
+        datos = request.get_json()
+        if not isinstance(datos, dict) or not isinstance(datos.get('gastos'), list):
+            return jsonify({'error': 'Se esperaba una lista en "gastos"'}), 400
+        if len(datos['gastos']) > Config.IMPORTACION_MAX_GASTOS:
+            return jsonify({'error': f'Se pueden importar como máximo {Config.IMPORTACION_MAX_GASTOS} gastos por solicitud'}), 413
+        validos = []
+        posiciones = []
+        invalidos = []
+        for indice, item in enumerate(datos['gastos']):
+            if not isinstance(item, dict):
+                invalidos.append({'indice': indice, 'errores': ['Cada gasto debe ser un objeto']})
+                continue
+            gasto, errores = crear_gasto_desde_json(item)
+            if not gasto:
+                invalidos.append({'indice': indice, 'errores': errores})
+                continue
+            validos.append(gasto.to_dict())
+            posiciones.append(indice)
+        resultado = importar_gastos_servicio(validos)
+        if resultado is None:
+            return jsonify({'error': 'No se pudieron importar los gastos'}), 500
+        return jsonify({
+            'insertados': resultado['insertados'],
+            'duplicados': [posiciones[i] for i in resultado['duplicados']],
+            'invalidos': invalidos
+        })
     except Exception as e:
         return jsonify({'error': 'Error interno del servidor', 'detalle': str(e)}), 500
 
@@ -65,6 +110,9 @@ def actualizar_gasto(gasto_id):
         datos = request.get_json()
         if not datos:
             return jsonify({'error': 'No se enviaron datos para actualizar'}), 400
+        datos, errores = actualizacion_desde_json(datos)
+        if not datos:
+            return jsonify({'error': 'Datos inválidos', 'errores': errores}), 400
         exito = editar_gasto_servicio(gasto_id, datos)
         if not exito:
             return jsonify({'error': 'No se pudo editar el gasto'}), 500
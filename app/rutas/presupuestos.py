@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify
+from app.servicios.presupuestos import estado_presupuestos, definir_limites
+from app.config.configuracion import Config
+from datetime import datetime
+
+
+presupuestos_bp = Blueprint('presupuestos', __name__)
+
+# ========================================
+# ENDPOINT 1: GET /api/presupuestos - ESTADO DEL MES POR CATEGORÍA
+# ========================================
+
+@presupuestos_bp.route('/presupuestos', methods=['GET'])
+def obtener_presupuestos():
+    try:
+        mes = request.args.get('mes')
+        if mes:
+            try:
+                datetime.strptime(mes, '%Y-%m')
+            except ValueError:
+                return jsonify({'error': 'El mes debe tener formato YYYY-MM (ej: 2025-12)'}), 400
+        return jsonify(estado_presupuestos(mes))
+    except Exception as e:
+        return jsonify({'error': 'Error interno del servidor', 'detalle': str(e)}), 500
+
+# ========================================
+# ENDPOINT 2: PUT /api/presupuestos - DEFINIR PRESUPUESTOS MENSUALES
+# ========================================
+
+@presupuestos_bp.route('/presupuestos', methods=['PUT'])
+def actualizar_presupuestos():
+    try:
+        datos = request.get_json()
+        if not datos or not isinstance(datos.get('limites'), dict):
+            return jsonify({'error': 'Se esperaba un objeto en "limites"'}), 400
+        errores = []
+        limites = {}
+        for categoria, monto in datos['limites'].items():
+            if categoria not in Config.CATEGORIAS_PERMITIDAS:
+                errores.append(f'Categoría inválida: {categoria}')
+                continue
+            try:
+                limites[categoria] = float(monto)
+            except (ValueError, TypeError):
+                errores.append(f'El presupuesto de {categoria} debe ser un número válido')
+                continue
+            if limites[categoria] < 0:
+                errores.append(f'El presupuesto de {categoria} no puede ser negativo')
+        if errores:
+            return jsonify({'error': 'Datos inválidos', 'errores': errores}), 400
+        if not definir_limites(limites):
+            return jsonify({'error': 'No se pudieron guardar los presupuestos'}), 500
+        return jsonify({'mensaje': 'Presupuestos actualizados exitosamente'})
+    except Exception as e:
+        return jsonify({'error': 'Error interno del servidor', 'detalle': str(e)}), 500
@@ -0,0 +1,155 @@
+import math
+from collections import OrderedDict
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify
+from pymongo import ReturnDocument
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, PyMongoError
+from app.config.base_datos import BaseDatos
+from app.config.configuracion import Config
+
+
+class BackendMemoria:
+    """
+    Token bucket en memoria del proceso. Las cubetas se guardan en orden
+    de último uso y, superado MAX_CUBETAS, se descarta la menos usada
+    """
+    MAX_CUBETAS = 10000
+
+    def __init__(self):
+        self._cubetas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, capacidad, tasa):
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._cubetas.pop(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ultimo) * tasa)
+            if tokens >= 1:
+                permitido, espera = True, 0
+                tokens -= 1
+            else:
+                permitido, espera = False, (1 - tokens) / tasa
+            self._cubetas[clave] = (tokens, ahora)
+            if len(self._cubetas) > self.MAX_CUBETAS:
+                self._cubetas.popitem(last=False)
+        return permitido, espera
+
+
+class BackendMongo:
+    """
+    Token bucket compartido entre procesos, guardado en la colección
+    'limites' y actualizado de forma atómica con un pipeline.
+    Si Mongo falla (caído, timeout o versión sin $$NOW) se usa un
+    BackendMemoria local durante ESPERA_REINTENTO segundos, para no
+    rechazar solicitudes por error ni esperar a Mongo en cada una
+    """
+    ESPERA_REINTENTO = 30
+
+    def __init__(self, nombre_coleccion='limites', expira_segundos=3600):
+        self._nombre_coleccion = nombre_coleccion
+        self._expira_segundos = expira_segundos
+        self._coleccion = None
+        self._respaldo = BackendMemoria()
+        self._reintentar_en = 0
+
+    def _obtener_coleccion(self):
+        if self._coleccion is None:
+            coleccion = BaseDatos().obtener_coleccion(self._nombre_coleccion)
+            if coleccion is None:
+                return None
+            coleccion.create_index('ultimo', expireAfterSeconds=self._expira_segundos)
+            self._coleccion = coleccion
+        return self._coleccion
+
+    def consumir(self, clave, capacidad, tasa):
+        if time.monotonic() < self._reintentar_en:
+            return self._respaldo.consumir(clave, capacidad, tasa)
+        try:
+            return self._consumir(clave, capacidad, tasa)
+        except PyMongoError as e:
+            print(f"Rate limit en Mongo no disponible, usando memoria: {e}")
+            self._reintentar_en = time.monotonic() + self.ESPERA_REINTENTO
+            return self._respaldo.consumir(clave, capacidad, tasa)
+
+    def _consumir(self, clave, capacidad, tasa):
+        coleccion = self._obtener_coleccion()
+        if coleccion is None:
+            raise ConnectionFailure('MongoDB no disponible')
+        transcurrido = {'$divide': [{'$subtract': ['$$NOW', {'$ifNull': ['$ultimo', '$$NOW']}]}, 1000]}
+        recargados = {'$min': [capacidad, {'$add': [{'$ifNull': ['$tokens', capacidad]}, {'$multiply': [transcurrido, tasa]}]}]}
+        cubeta = coleccion.find_one_and_update(
+            {'_id': clave},
+            [
+                {'$set': {'tokens': recargados, 'ultimo': '$$NOW'}},
+                {'$set': {
+                    'permitido': {'$gte': ['$tokens', 1]},
+                    'tokens': {'$cond': [{'$gte': ['$tokens', 1]}, {'$subtract': ['$tokens', 1]}, '$tokens']}
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if cubeta['permitido']:
+            return True, 0
+        return False, (1 - cubeta['tokens']) / tasa
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def configurar_backend(backend):
+    """
+    Permite enchufar cualquier objeto con consumir(clave, capacidad, tasa)
+    """
+    global _backend
+    _backend = backend
+
+
+def obtener_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = BackendMongo() if Config.LIMITES_BACKEND == 'mongo' else BackendMemoria()
+    return _backend
+
+
+def respuesta_saturacion(codigo, mensaje, retry_after=None):
+    if retry_after is None:
+        retry_after = Config.ADMISION_RETRY_AFTER
+    respuesta = jsonify({'error': mensaje})
+    respuesta.status_code = codigo
+    respuesta.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return respuesta
+
+
+def limitar(nombre):
+    """
+    Aplica a la vista los límites de Config.LIMITES_ENDPOINTS[nombre]:
+    rate limit por cliente (429) y concurrencia máxima por proceso (503)
+    """
+    limites = Config.LIMITES_ENDPOINTS.get(nombre, {})
+    concurrencia = limites.get('concurrencia')
+    semaforo = threading.BoundedSemaphore(concurrencia) if concurrencia else None
+
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if limites.get('tasa'):
+                clave = f"{nombre}:{request.remote_addr}"
+                permitido, espera = obtener_backend().consumir(clave, limites.get('rafaga', 1), limites['tasa'])
+                if not permitido:
+                    return respuesta_saturacion(429, 'Demasiadas solicitudes', espera)
+            if semaforo is not None and not semaforo.acquire(blocking=False):
+                return respuesta_saturacion(503, 'Servidor saturado, reintente más tarde')
+            try:
+                return vista(*args, **kwargs)
+            except ExecutionTimeout:
+                return respuesta_saturacion(503, 'La consulta excedió el tiempo máximo')
+            finally:
+                if semaforo is not None:
+                    semaforo.release()
+        return envoltura
+    return decorador
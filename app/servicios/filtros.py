@@ -1,7 +1,11 @@
 from datetime import datetime, timedelta
 from flask import request, jsonify
+from pymongo.errors import ExecutionTimeout
 from app.config.base_datos import obtener_db
-import re
+from app.servicios.admision import limitar
+from app.config.configuracion import Config
+from app.modelos.gasto import Gasto
+from app.servicios.planificador import planificar, cursor_para, agregar_para
 
 class FiltroService:
     @staticmethod
@@ -15,45 +19,23 @@ class FiltroService:
         - monto_min: monto mínimo
         - monto_max: monto máximo
         - busqueda: texto a buscar en descripción
+        
+        Devuelve (gastos, truncado): si hay más de CONSULTA_MAX_DOCUMENTOS
+        resultados se devuelven los primeros y truncado es True
         """
         db = obtener_db()
-        query = {}
-        
-        if filtros.get('fecha_inicio') or filtros.get('fecha_fin'):
-            fecha_query = {}
-            if filtros.get('fecha_inicio'):
-                fecha_query['$gte'] = filtros['fecha_inicio']
-            if filtros.get('fecha_fin'):
-                fecha_query['$lte'] = filtros['fecha_fin']
-            query['fecha'] = fecha_query
-        
-        if filtros.get('categorias') and len(filtros['categorias']) > 0:
-            query['categoria'] = {'$in': filtros['categorias']}
-        
-        if filtros.get('origen'):
-            query['origen'] = filtros['origen']
-
-        if filtros.get('monto_min') or filtros.get('monto_max'):
-            monto_query = {}
-            if filtros.get('monto_min'):
-                monto_query['$gte'] = float(filtros['monto_min'])
-            if filtros.get('monto_max'):
-                monto_query['$lte'] = float(filtros['monto_max'])
-            query['monto'] = monto_query
-        
-        if filtros.get('busqueda'):
-            query['descripcion'] = {
-                '$regex': re.escape(filtros['busqueda']),
-                '$options': 'i'
-            }
-        
-        gastos = list(db.gastos.find(query).sort('fecha', -1))
+        plan = planificar(filtros)
+        gastos = list(cursor_para(db.gastos, plan, Config.CONSULTA_MAX_DOCUMENTOS + 1))
+        truncado = len(gastos) > Config.CONSULTA_MAX_DOCUMENTOS
+        gastos = gastos[:Config.CONSULTA_MAX_DOCUMENTOS]
         
         for gasto in gastos:
             gasto['id'] = str(gasto['_id'])
             del gasto['_id']
+            for campo in Gasto.CAMPOS_INTERNOS:
+                gasto.pop(campo, None)
         
-        return gastos
+        return gastos, truncado
     
     @staticmethod
     def obtener_estadisticas_filtradas(gastos_filtrados):
@@ -99,6 +81,36 @@ class FiltroService:
             'por_origen': por_origen
         }
     
+    @staticmethod
+    def obtener_estadisticas_consulta(filtros):
+        """Calcula las estadísticas de todos los gastos que cumplen los filtros con $group"""
+        db = obtener_db()
+        plan = planificar(filtros)
+        resultado = next(agregar_para(db.gastos, plan, [
+            {'$facet': {
+                'total': [{'$group': {'_id': None, 'total': {'$sum': '$monto'}, 'cantidad': {'$sum': 1}}}],
+                'por_categoria': [
+                    {'$group': {'_id': '$categoria', 'total': {'$sum': '$monto'}}},
+                    {'$sort': {'total': -1}}
+                ],
+                'por_origen': [
+                    {'$group': {'_id': '$origen', 'total': {'$sum': '$monto'}}},
+                    {'$sort': {'total': -1}}
+                ]
+            }}
+        ]))
+        if not resultado['total']:
+            return FiltroService.obtener_estadisticas_filtradas([])
+        total = resultado['total'][0]['total']
+        cantidad = resultado['total'][0]['cantidad']
+        return {
+            'total': round(total, 2),
+            'promedio': round(total / cantidad, 2),
+            'cantidad': cantidad,
+            'por_categoria': [{'categoria': doc['_id'], 'total': doc['total']} for doc in resultado['por_categoria']],
+            'por_origen': [{'origen': doc['_id'], 'total': doc['total']} for doc in resultado['por_origen']]
+        }
+    
     @staticmethod
     def obtener_rangos_sugeridos():
         """Obtiene rangos de fechas comunes para filtros rápidos"""
@@ -134,19 +146,26 @@ class FiltroService:
 
 def agregar_endpoints_filtros(app):
     @app.route('/api/gastos/filtrar', methods=['POST'])
+    @limitar('filtrar_gastos')
     def filtrar_gastos_api():
         filtros = request.get_json() or {}
         
         try:
-            gastos_filtrados = FiltroService.filtrar_gastos(filtros)
-            estadisticas = FiltroService.obtener_estadisticas_filtradas(gastos_filtrados)
+            gastos_filtrados, truncado = FiltroService.filtrar_gastos(filtros)
+            if truncado:
+                estadisticas = FiltroService.obtener_estadisticas_consulta(filtros)
+            else:
+                estadisticas = FiltroService.obtener_estadisticas_filtradas(gastos_filtrados)
             
             return jsonify({
                 'success': True,
                 'gastos': gastos_filtrados,
                 'estadisticas': estadisticas,
-                'total_resultados': len(gastos_filtrados)
+                'total_resultados': estadisticas['cantidad'],
+                'truncado': truncado
             })
+        except ExecutionTimeout:
+            raise
         except Exception as e:
             return jsonify({
                 'success': False,
@@ -1,26 +1,96 @@
 from app.config.base_datos import obtener_coleccion_gastos
 from app.modelos.gasto import Gasto
 from app.config.configuracion import Config
+from app.servicios.presupuestos import registrar_movimiento, registrar_lote, monto_como_numero
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from collections import Counter
 from datetime import datetime
-import pandas as pd
 
 def listar_gastos():
+    """
+    Devuelve (gastos, truncado). Se pide un documento más que
+    CONSULTA_MAX_DOCUMENTOS para saber si quedaron gastos afuera
+    """
     coleccion = obtener_coleccion_gastos()
     gastos = []
+    truncado = False
     if coleccion is not None:
-        cursor = coleccion.find().sort('fecha', -1)
+        cursor = (
+            coleccion.find()
+            .sort('fecha', -1)
+            .limit(Config.CONSULTA_MAX_DOCUMENTOS + 1)
+            .max_time_ms(Config.CONSULTA_MAX_TIME_MS)
+        )
         for gasto in cursor:
             gastos.append(Gasto.formatear_para_respuesta(gasto))
-    return gastos
+        truncado = len(gastos) > Config.CONSULTA_MAX_DOCUMENTOS
+        gastos = gastos[:Config.CONSULTA_MAX_DOCUMENTOS]
+    return gastos, truncado
 
 
-def crear_gasto(data):
+def crear_gasto(data, clave_idempotencia=None):
+    """
+    Devuelve (gasto_id, estado) donde estado es:
+    - 'creado': se insertó un gasto nuevo
+    - 'repetido': la clave de idempotencia ya se usó con el mismo contenido
+    - 'conflicto': la clave de idempotencia ya se usó con otro contenido
+    """
     coleccion = obtener_coleccion_gastos()
-    if coleccion is not None:
-        coleccion.insert_one(data)
-        return True
-    return False
+    if coleccion is None:
+        return None, None
+    data['huella'] = Gasto.calcular_huella(data)
+    if clave_idempotencia:
+        # la huella de la solicitud no cambia al editar el gasto, así un
+        # reintento posterior a una edición sigue contando como 'repetido'
+        data['clave_idempotencia'] = clave_idempotencia
+        data['huella_solicitud'] = data['huella']
+    try:
+        resultado = coleccion.insert_one(data)
+    except DuplicateKeyError:
+        data.pop('_id', None)
+    else:
+        registrar_movimiento(data.get('categoria'), data.get('fecha'), data.get('monto'))
+        return str(resultado.inserted_id), 'creado'
+    if clave_idempotencia:
+        existente = coleccion.find_one({'clave_idempotencia': clave_idempotencia}, {'huella_solicitud': 1})
+        if existente:
+            estado = 'repetido' if existente.get('huella_solicitud') == data['huella'] else 'conflicto'
+            return str(existente['_id']), estado
+    return None, None
+
+
+def importar_gastos(lista_gastos):
+    """
+    Inserta un lote de gastos salteando los que ya están en la base,
+    buscando las huellas del lote en el índice de huella.
+    Se compara por cantidad: si el lote trae dos gastos iguales y la
+    base tiene uno, se inserta sólo el segundo
+    """
+    coleccion = obtener_coleccion_gastos()
+    if coleccion is None:
+        return None
+    if not lista_gastos:
+        return {'insertados': 0, 'duplicados': []}
+    for data in lista_gastos:
+        data['huella'] = Gasto.calcular_huella(data)
+    huellas = list(set(data['huella'] for data in lista_gastos))
+    existentes = Counter(
+        gasto['huella'] for gasto in coleccion.find({'huella': {'$in': huellas}}, {'huella': 1, '_id': 0})
+    )
+    nuevos = []
+    duplicados = []
+    for indice, data in enumerate(lista_gastos):
+        if existentes[data['huella']] > 0:
+            existentes[data['huella']] -= 1
+            duplicados.append(indice)
+        else:
+            nuevos.append(data)
+    if nuevos:
+        coleccion.insert_many(nuevos, ordered=False)
+        registrar_lote(nuevos)
+    return {'insertados': len(nuevos), 'duplicados': duplicados}
 
 
 def obtener_gasto(gasto_id):
@@ -33,18 +103,48 @@ def obtener_gasto(gasto_id):
 
 
 def editar_gasto(gasto_id, datos_actualizados):
+    """
+    Aplica la edición con find_one_and_update para obtener el estado
+    anterior de forma atómica y mover el gastado del presupuesto desde
+    ese estado, aunque haya otra edición concurrente
+    """
     coleccion = obtener_coleccion_gastos()
     if coleccion is not None:
-        resultado = coleccion.update_one({'_id': ObjectId(gasto_id)}, {'$set': datos_actualizados})
-        return resultado.modified_count > 0
+        datos = dict(datos_actualizados)
+        if 'categoria' in datos and datos['categoria'] not in Config.CATEGORIAS_PERMITIDAS:
+            return False
+        if 'monto' in datos:
+            datos['monto'] = float(datos['monto'])
+        anterior = coleccion.find_one_and_update(
+            {'_id': ObjectId(gasto_id)},
+            {'$set': datos},
+            return_document=ReturnDocument.BEFORE
+        )
+        if anterior is None:
+            return False
+        nuevo = {**anterior, **datos}
+        campos_huella = {campo: nuevo.get(campo) for campo in ('fecha', 'monto', 'descripcion', 'origen')}
+        coleccion.update_one(
+            {'_id': anterior['_id'], **campos_huella},
+            {'$set': {'huella': Gasto.calcular_huella(nuevo)}}
+        )
+        if any(nuevo.get(campo) != anterior.get(campo) for campo in ('categoria', 'fecha', 'monto')):
+            monto_anterior = monto_como_numero(anterior.get('monto'))
+            monto_nuevo = monto_como_numero(nuevo.get('monto'))
+            registrar_movimiento(anterior.get('categoria'), anterior.get('fecha'), -monto_anterior)
+            registrar_movimiento(nuevo.get('categoria'), nuevo.get('fecha'), monto_nuevo)
+        return True
     return False
 
 
 def borrar_gasto(gasto_id):
     coleccion = obtener_coleccion_gastos()
     if coleccion is not None:
-        resultado = coleccion.delete_one({'_id': ObjectId(gasto_id)})
-        return resultado.deleted_count > 0
+        borrado = coleccion.find_one_and_delete({'_id': ObjectId(gasto_id)})
+        if borrado is None:
+            return False
+        registrar_movimiento(borrado.get('categoria'), borrado.get('fecha'), -monto_como_numero(borrado.get('monto')))
+        return True
     return False
 
 
@@ -52,14 +152,16 @@ def estadisticas_por_categoria():
     coleccion = obtener_coleccion_gastos()
     if coleccion is None:
         return []
-    gastos = list(coleccion.find())
-    if not gastos:
-        return []
-    df = pd.DataFrame(gastos)
-    if 'categoria' not in df or 'monto' not in df:
+    resumen = {
+        doc['_id']: float(doc['total'])
+        for doc in coleccion.aggregate(
+            [{'$group': {'_id': '$categoria', 'total': {'$sum': '$monto'}}}],
+            maxTimeMS=Config.CONSULTA_MAX_TIME_MS
+        )
+    }
+    if not resumen:
         return []
-    resumen = df.groupby('categoria')['monto'].sum().reset_index()
-    total = resumen['monto'].sum()
+    total = sum(resumen.values())
 
     colores = {
         "Alimentación": "#FF6384",
@@ -74,7 +176,7 @@ def estadisticas_por_categoria():
     }
     resultado = []
     for categoria in Config.CATEGORIAS_PERMITIDAS:
-        monto = float(resumen[resumen['categoria'] == categoria]['monto'].sum()) if categoria in resumen['categoria'].values else 0.0
+        monto = resumen.get(categoria, 0.0)
         porcentaje = round((monto / total) * 100, 2) if total > 0 else 0
         resultado.append({
             'categoria': categoria,
@@ -0,0 +1,190 @@
+from itertools import product
+from app.config.configuracion import Config
+import re
+
+# Índices de consulta siguiendo la regla igualdad -> orden -> rango:
+# los filtros de igualdad ($in incluido) primero, luego 'fecha' para que
+# el orden salga del índice sin SORT en memoria, y 'monto' al final para
+# filtrar el rango dentro del mismo recorrido del índice
+INDICES = {
+    'fecha_monto': [('fecha', -1), ('monto', 1)],
+    'categoria_fecha_monto': [('categoria', 1), ('fecha', -1), ('monto', 1)],
+    'origen_fecha_monto': [('origen', 1), ('fecha', -1), ('monto', 1)],
+    'origen_categoria_fecha_monto': [('origen', 1), ('categoria', 1), ('fecha', -1), ('monto', 1)]
+}
+
+INDICE_POR_FORMA = {
+    (False, False): 'fecha_monto',
+    (False, True): 'categoria_fecha_monto',
+    (True, False): 'origen_fecha_monto',
+    (True, True): 'origen_categoria_fecha_monto'
+}
+
+ORDEN = [('fecha', -1)]
+
+
+def crear_indices(coleccion):
+    for nombre, claves in INDICES.items():
+        coleccion.create_index(claves, name=nombre)
+
+
+def _presente(valor):
+    return valor is not None and str(valor).strip() != ''
+
+
+def normalizar_filtros(filtros):
+    """
+    Lleva el dict de filtros a una forma canónica: sin claves vacías,
+    categorías como lista ordenada sin repetidos y montos como float
+    """
+    normalizados = {}
+    for campo in ('fecha_inicio', 'fecha_fin', 'origen', 'busqueda'):
+        if _presente(filtros.get(campo)):
+            normalizados[campo] = str(filtros[campo]).strip()
+    categorias = filtros.get('categorias')
+    if isinstance(categorias, str):
+        categorias = [categorias]
+    categorias = sorted(set(c for c in categorias or [] if _presente(c)))
+    if categorias:
+        normalizados['categorias'] = categorias
+    for campo in ('monto_min', 'monto_max'):
+        if _presente(filtros.get(campo)):
+            normalizados[campo] = float(filtros[campo])
+    return normalizados
+
+
+def forma_de(normalizados):
+    """
+    Nombre de la forma canónica, p.ej. 'categoria+monto+origen'
+    """
+    partes = []
+    if 'fecha_inicio' in normalizados or 'fecha_fin' in normalizados:
+        partes.append('fecha')
+    if 'categorias' in normalizados:
+        partes.append('categoria')
+    if 'monto_min' in normalizados or 'monto_max' in normalizados:
+        partes.append('monto')
+    if 'origen' in normalizados:
+        partes.append('origen')
+    if 'busqueda' in normalizados:
+        partes.append('busqueda')
+    return '+'.join(partes) or 'todos'
+
+
+def construir_consulta(normalizados):
+    consulta = {}
+    if 'origen' in normalizados:
+        consulta['origen'] = normalizados['origen']
+    if 'categorias' in normalizados:
+        categorias = normalizados['categorias']
+        consulta['categoria'] = categorias[0] if len(categorias) == 1 else {'$in': categorias}
+    rango_fecha = {}
+    if 'fecha_inicio' in normalizados:
+        rango_fecha['$gte'] = normalizados['fecha_inicio']
+    if 'fecha_fin' in normalizados:
+        rango_fecha['$lte'] = normalizados['fecha_fin']
+    if rango_fecha:
+        consulta['fecha'] = rango_fecha
+    rango_monto = {}
+    if 'monto_min' in normalizados:
+        rango_monto['$gte'] = normalizados['monto_min']
+    if 'monto_max' in normalizados:
+        rango_monto['$lte'] = normalizados['monto_max']
+    if rango_monto:
+        consulta['monto'] = rango_monto
+    if 'busqueda' in normalizados:
+        consulta['descripcion'] = {
+            '$regex': re.escape(normalizados['busqueda']),
+            '$options': 'i'
+        }
+    return consulta
+
+
+def planificar(filtros):
+    normalizados = normalizar_filtros(filtros)
+    indice = INDICE_POR_FORMA[('origen' in normalizados, 'categorias' in normalizados)]
+    return {
+        'forma': forma_de(normalizados),
+        'consulta': construir_consulta(normalizados),
+        'orden': ORDEN,
+        'indice': indice
+    }
+
+
+def cursor_para(coleccion, plan, limite=None):
+    return (
+        coleccion.find(plan['consulta'])
+        .sort(plan['orden'])
+        .hint(plan['indice'])
+        .limit(limite if limite is not None else Config.CONSULTA_MAX_DOCUMENTOS)
+        .max_time_ms(Config.CONSULTA_MAX_TIME_MS)
+    )
+
+
+def agregar_para(coleccion, plan, etapas):
+    return coleccion.aggregate(
+        [{'$match': plan['consulta']}] + etapas,
+        hint=plan['indice'],
+        maxTimeMS=Config.CONSULTA_MAX_TIME_MS
+    )
+
+
+def _nodos(plan):
+    nodos = []
+    pendientes = [plan]
+    while pendientes:
+        nodo = pendientes.pop()
+        nodos.append(nodo)
+        for clave in ('inputStage', 'queryPlan'):
+            if clave in nodo:
+                pendientes.append(nodo[clave])
+        pendientes.extend(nodo.get('inputStages', []))
+    return nodos
+
+
+def filtros_de_muestra():
+    """
+    Un dict de filtros por cada combinación de dimensiones
+    (fecha, categorías, origen, monto, búsqueda)
+    """
+    muestras = []
+    for fecha, categorias, origen, monto, busqueda in product([False, True], repeat=5):
+        filtros = {}
+        if fecha:
+            filtros.update({'fecha_inicio': '01-01-2025', 'fecha_fin': '31-12-2025'})
+        if categorias:
+            filtros['categorias'] = Config.CATEGORIAS_PERMITIDAS[:3]
+        if origen:
+            filtros['origen'] = 'Efectivo'
+        if monto:
+            filtros.update({'monto_min': 100, 'monto_max': 5000})
+        if busqueda:
+            filtros['busqueda'] = 'super'
+        muestras.append(filtros)
+    return muestras
+
+
+def explicar(coleccion, plan):
+    """
+    Devuelve (etapas, indices) del plan ganador de explain()
+    """
+    explicacion = cursor_para(coleccion, plan).explain()
+    nodos = _nodos(explicacion['queryPlanner']['winningPlan'])
+    etapas = [nodo['stage'] for nodo in nodos if 'stage' in nodo]
+    indices = set(nodo.get('indexName') for nodo in nodos if nodo.get('stage') == 'IXSCAN')
+    return etapas, indices
+
+
+def verificar_planes(coleccion, muestras=None):
+    """
+    Ejecuta explain() de cada forma y devuelve las que usan COLLSCAN,
+    un SORT en memoria o un índice distinto al elegido por planificar
+    (lista vacía si todos los planes son correctos)
+    """
+    problemas = []
+    for filtros in muestras if muestras is not None else filtros_de_muestra():
+        plan = planificar(filtros)
+        etapas, indices = explicar(coleccion, plan)
+        if 'COLLSCAN' in etapas or 'SORT' in etapas or indices != {plan['indice']}:
+            problemas.append({'forma': plan['forma'], 'indice': plan['indice'], 'etapas': etapas})
+    return problemas
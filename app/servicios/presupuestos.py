@@ -0,0 +1,209 @@
+from app.config.base_datos import obtener_coleccion_presupuestos, obtener_coleccion_gastos
+from app.config.configuracion import Config
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from datetime import datetime
+
+ID_LIMITES = 'limites'
+
+
+def mes_de_fecha(fecha):
+    """
+    Convierte una fecha DD-MM-YYYY en la clave de mes YYYY-MM
+    """
+    try:
+        return datetime.strptime(fecha, '%d-%m-%Y').strftime('%Y-%m')
+    except (ValueError, TypeError):
+        return None
+
+
+def monto_como_numero(monto):
+    """
+    Monto guardado como float; los valores no numéricos que hayan
+    quedado de versiones anteriores cuentan como 0
+    """
+    try:
+        return float(monto)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def nivel_alerta(gastado, limite):
+    if not limite:
+        return None
+    if gastado >= limite:
+        return 'excedido'
+    if gastado >= limite * Config.PRESUPUESTO_UMBRAL_ALERTA:
+        return 'advertencia'
+    return None
+
+
+def _limites_desde_doc(doc):
+    limites = dict(Config.PRESUPUESTOS_MENSUALES)
+    if doc:
+        limites.update(doc.get('categorias', {}))
+    return limites
+
+
+def obtener_limites():
+    coleccion = obtener_coleccion_presupuestos()
+    if coleccion is None:
+        return dict(Config.PRESUPUESTOS_MENSUALES)
+    return _limites_desde_doc(coleccion.find_one({'_id': ID_LIMITES}))
+
+
+def definir_limites(limites):
+    coleccion = obtener_coleccion_presupuestos()
+    if coleccion is None:
+        return False
+    cambios = {f'categorias.{categoria}': float(monto) for categoria, monto in limites.items()}
+    coleccion.update_one({'_id': ID_LIMITES}, {'$set': cambios}, upsert=True)
+    return True
+
+
+def _actualizar_alertas(coleccion, doc_mes, categorias, limites):
+    gastado = doc_mes.get('gastado', {})
+    alertas = doc_mes.get('alertas', {})
+    niveles = {}
+    cambios = {}
+    for categoria in categorias:
+        nivel = nivel_alerta(gastado.get(categoria, 0), limites.get(categoria))
+        niveles[categoria] = nivel
+        if nivel != alertas.get(categoria):
+            cambios[f'alertas.{categoria}'] = nivel
+            if nivel:
+                print(f"Alerta de presupuesto: {categoria} {nivel} en {doc_mes['_id']}")
+    if cambios:
+        coleccion.update_one({'_id': doc_mes['_id']}, {'$set': cambios})
+    return niveles
+
+
+def registrar_movimiento(categoria, fecha, monto):
+    """
+    Suma (o resta, con monto negativo) al gastado del mes con un $inc
+    y devuelve el nivel de alerta resultante para la categoría.
+    Se llama después de que el gasto ya se guardó: si falla, se registra
+    el error y no se propaga (se corrige con scripts/recalcular_presupuestos.py)
+    """
+    mes = mes_de_fecha(fecha)
+    monto = monto_como_numero(monto)
+    if mes is None or categoria not in Config.CATEGORIAS_PERMITIDAS or not monto:
+        return None
+    try:
+        try:
+            return _registrar_movimiento(mes, categoria, monto)
+        except DuplicateKeyError:
+            # dos upserts simultáneos del primer gasto del mes: el segundo ya encuentra el documento
+            return _registrar_movimiento(mes, categoria, monto)
+    except PyMongoError as e:
+        print(f"No se pudo actualizar el presupuesto de {categoria} en {mes}: {e}")
+        return None
+
+
+def _registrar_movimiento(mes, categoria, monto):
+    coleccion = obtener_coleccion_presupuestos()
+    if coleccion is None:
+        return None
+    doc_mes = coleccion.find_one_and_update(
+        {'_id': mes},
+        {'$inc': {f'gastado.{categoria}': monto}},
+        projection={f'gastado.{categoria}': 1, f'alertas.{categoria}': 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    limites = _limites_desde_doc(coleccion.find_one({'_id': ID_LIMITES}))
+    return _actualizar_alertas(coleccion, doc_mes, [categoria], limites)[categoria]
+
+
+def registrar_lote(gastos):
+    """
+    Igual que registrar_movimiento pero agrupando un lote de gastos
+    en un único bulk_write de $inc por mes
+    """
+    try:
+        _registrar_lote(gastos)
+    except PyMongoError as e:
+        print(f"No se pudo actualizar el presupuesto del lote importado: {e}")
+
+
+def _registrar_lote(gastos):
+    coleccion = obtener_coleccion_presupuestos()
+    if coleccion is None or not gastos:
+        return
+    incrementos = {}
+    for gasto in gastos:
+        mes = mes_de_fecha(gasto.get('fecha'))
+        if mes is None or gasto.get('categoria') not in Config.CATEGORIAS_PERMITIDAS:
+            continue
+        campos = incrementos.setdefault(mes, {})
+        clave = f"gastado.{gasto['categoria']}"
+        campos[clave] = campos.get(clave, 0) + monto_como_numero(gasto.get('monto'))
+    if not incrementos:
+        return
+    coleccion.bulk_write(
+        [UpdateOne({'_id': mes}, {'$inc': campos}, upsert=True) for mes, campos in incrementos.items()],
+        ordered=False
+    )
+    limites = _limites_desde_doc(coleccion.find_one({'_id': ID_LIMITES}))
+    for doc_mes in coleccion.find({'_id': {'$in': list(incrementos)}}):
+        categorias = [clave.split('.', 1)[1] for clave in incrementos[doc_mes['_id']]]
+        _actualizar_alertas(coleccion, doc_mes, categorias, limites)
+
+
+def estado_presupuestos(mes=None):
+    """
+    Gastado vs presupuesto de todas las categorías del mes (YYYY-MM),
+    leyendo por _id el documento del mes y el de límites
+    """
+    mes = mes or datetime.now().strftime('%Y-%m')
+    coleccion = obtener_coleccion_presupuestos()
+    docs = {}
+    if coleccion is not None:
+        docs = {doc['_id']: doc for doc in coleccion.find({'_id': {'$in': [mes, ID_LIMITES]}})}
+    limites = _limites_desde_doc(docs.get(ID_LIMITES))
+    gastado = docs.get(mes, {}).get('gastado', {})
+    resultado = []
+    for categoria in Config.CATEGORIAS_PERMITIDAS:
+        limite = limites.get(categoria)
+        monto = round(gastado.get(categoria, 0.0), 2)
+        resultado.append({
+            'categoria': categoria,
+            'gastado': monto,
+            'limite': limite,
+            'restante': round(limite - monto, 2) if limite else None,
+            'porcentaje': round((monto / limite) * 100, 2) if limite else None,
+            'alerta': nivel_alerta(monto, limite)
+        })
+    return {'mes': mes, 'categorias': resultado}
+
+
+def recalcular_presupuestos(meses=None):
+    """
+    Reconstruye los contadores desde la colección de gastos, con las
+    mismas reglas que registrar_movimiento (mes_de_fecha, categorías
+    permitidas y monto_como_numero). Sin meses recalcula todos.
+    Sólo para migrar datos previos o corregir desvíos; el camino normal
+    es el $inc en cada escritura. Devuelve los meses recalculados
+    """
+    gastos = obtener_coleccion_gastos()
+    coleccion = obtener_coleccion_presupuestos()
+    if gastos is None or coleccion is None:
+        return None
+    totales = {mes: {} for mes in meses or []}
+    for gasto in gastos.find({}, {'fecha': 1, 'categoria': 1, 'monto': 1}):
+        mes = mes_de_fecha(gasto.get('fecha'))
+        categoria = gasto.get('categoria')
+        if mes is None or categoria not in Config.CATEGORIAS_PERMITIDAS:
+            continue
+        if meses and mes not in totales:
+            continue
+        gastado = totales.setdefault(mes, {})
+        gastado[categoria] = gastado.get(categoria, 0) + monto_como_numero(gasto.get('monto'))
+    if not meses:
+        for doc in coleccion.find({'_id': {'$ne': ID_LIMITES}}, {'_id': 1}):
+            totales.setdefault(doc['_id'], {})
+    limites = _limites_desde_doc(coleccion.find_one({'_id': ID_LIMITES}))
+    for mes, gastado in totales.items():
+        coleccion.update_one({'_id': mes}, {'$set': {'gastado': gastado, 'alertas': {}}}, upsert=True)
+        _actualizar_alertas(coleccion, {'_id': mes, 'gastado': gastado, 'alertas': {}}, list(gastado), limites)
+    return sorted(totales)
@@ -0,0 +1,32 @@
+"""
+Reconstruye los contadores de presupuesto desde la colección de gastos.
+Hace falta una vez para los gastos cargados antes de que existieran los
+presupuestos, o para corregir un desvío.
+
+Uso: python scripts/recalcular_presupuestos.py [YYYY-MM ...]
+Sin meses recalcula todos.
+"""
+import os, sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datetime import datetime
+from app.servicios.presupuestos import recalcular_presupuestos
+
+
+def main(argumentos):
+    meses = []
+    for mes in argumentos:
+        try:
+            meses.append(datetime.strptime(mes, '%Y-%m').strftime('%Y-%m'))
+        except ValueError:
+            print(f"Mes inválido: {mes} (formato YYYY-MM)")
+            return 1
+    meses = recalcular_presupuestos(meses or None)
+    if meses is None:
+        print("No se pudo conectar a MongoDB")
+        return 1
+    print(f"Presupuestos recalculados: {', '.join(meses) if meses else 'ningún mes con gastos'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Regresión de planes de consulta de FiltroService: cada forma de filtro
+debe elegir el índice que le corresponde y, ejecutada con explain()
+sobre datos de prueba, recorrer ese índice sin COLLSCAN ni SORT en memoria.
+Los tests con explain() se saltean si MongoDB no está disponible.
+"""
+import os
+import random
+import pytest
+
+from app.config.configuracion import Config
+from app.servicios.planificador import crear_indices, explicar, planificar, verificar_planes
+
+COLECCION = 'gastos_verificacion_planes'
+ORIGENES = ['Efectivo', 'Débito', 'Crédito', 'Transferencia']
+
+CATEGORIAS_CON_RANGO_DE_MONTO = {'categorias': ['Salud', 'Ropa'], 'monto_min': 100, 'monto_max': 5000}
+
+
+def sembrar(coleccion, cantidad=2000):
+    aleatorio = random.Random(42)
+    coleccion.insert_many([
+        {
+            'descripcion': f'Compra {i} supermercado' if i % 5 == 0 else f'Gasto {i}',
+            'monto': round(aleatorio.uniform(10, 10000), 2),
+            'categoria': aleatorio.choice(Config.CATEGORIAS_PERMITIDAS),
+            'origen': aleatorio.choice(ORIGENES),
+            'fecha': f'{aleatorio.randint(1, 28):02d}-{aleatorio.randint(1, 12):02d}-{aleatorio.choice([2024, 2025])}'
+        }
+        for i in range(cantidad)
+    ])
+
+
+@pytest.fixture(scope='module')
+def coleccion():
+    pymongo = pytest.importorskip('pymongo')
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/gastotrack')
+    try:
+        cliente = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=2000)
+        cliente.admin.command('ping')
+    except pymongo.errors.PyMongoError:
+        pytest.skip('MongoDB no disponible')
+    coleccion = cliente[mongo_uri.split('/')[-1] or 'gastotrack'][COLECCION]
+    coleccion.drop()
+    sembrar(coleccion)
+    crear_indices(coleccion)
+    yield coleccion
+    coleccion.drop()
+    cliente.close()
+
+
+@pytest.mark.parametrize('filtros, indice', [
+    ({}, 'fecha_monto'),
+    ({'fecha_inicio': '01-01-2025', 'monto_max': 500, 'busqueda': 'super'}, 'fecha_monto'),
+    (CATEGORIAS_CON_RANGO_DE_MONTO, 'categoria_fecha_monto'),
+    ({'categorias': 'Salud', 'fecha_fin': '31-12-2025'}, 'categoria_fecha_monto'),
+    ({'origen': 'Efectivo', 'monto_min': 100}, 'origen_fecha_monto'),
+    ({'origen': 'Efectivo', 'categorias': ['Salud', 'Ropa']}, 'origen_categoria_fecha_monto'),
+])
+def test_indice_segun_forma(filtros, indice):
+    assert planificar(filtros)['indice'] == indice
+
+
+def test_categorias_con_rango_de_monto():
+    plan = planificar(CATEGORIAS_CON_RANGO_DE_MONTO)
+    assert plan['consulta'] == {
+        'categoria': {'$in': ['Ropa', 'Salud']},
+        'monto': {'$gte': 100.0, '$lte': 5000.0}
+    }
+    assert plan['orden'] == [('fecha', -1)]
+
+
+def test_una_categoria_usa_igualdad():
+    assert planificar({'categorias': ['Salud', 'Salud']})['consulta'] == {'categoria': 'Salud'}
+
+
+def test_categorias_vacias_no_filtran():
+    plan = planificar({'categorias': ['', '  ']})
+    assert 'categoria' not in plan['consulta']
+    assert plan['indice'] == 'fecha_monto'
+
+
+def test_categorias_con_rango_de_monto_ordena_con_sort_merge(coleccion):
+    etapas, indices = explicar(coleccion, planificar(CATEGORIAS_CON_RANGO_DE_MONTO))
+    assert indices == {'categoria_fecha_monto'}
+    assert 'SORT_MERGE' in etapas
+    assert 'SORT' not in etapas
+    assert 'COLLSCAN' not in etapas
+
+
+def test_planes_sin_collscan_ni_sort(coleccion):
+    assert verificar_planes(coleccion) == []